@@ -1,5 +1,6 @@
+from .commands import Taxon
 from .taxonomy import Taxonomy
 
-__all__ = ["Taxonomy"]
+__all__ = ["Taxon", "Taxonomy"]
 
 __version__ = "0.1.0"
@@ -1,14 +1,29 @@
+from enum import IntEnum
 from typing import Literal
 
 
+class Taxon(IntEnum):
+    """门、纲、目、科、属、种六个类别，值即为其在分类链中的位置。"""
+
+    PHYLUM = 0
+    CLASS = 1
+    ORDER = 2
+    FAMILY = 3
+    GENUS = 4
+    SPECIES = 5
+
+
+# 各类别对应的表名，以`Taxon`的值为下标
+TAXA_NAMES = ("phylum", "class", "order", "family", "genus", "species")
+
+
 def create_data(
     taxon: Literal["phylum", "class", "order", "family", "genus", "species"],
-    values: list[str],
 ) -> str:
-    values_str = ", ".join(values)
+    placeholders = "?, ?, ?" if taxon == "phylum" else "?, ?, ?, ?"
     return f"""
 insert into "{taxon}"
-values ({values_str});
+values ({placeholders});
 """
 
 
@@ -17,7 +32,7 @@ def create_table_class_to_species(
     parent_taxon: Literal["phylum", "class", "order", "family", "genus"],
 ) -> str:
     return f"""
-create table "{taxon}"
+create table if not exists "{taxon}"
 (
     chinese     text NOT NULL,
     scientific  text NOT NULL,
@@ -29,12 +44,21 @@ create table "{taxon}"
 """
 
 
+def create_index_parent(
+    taxon: Literal["class", "order", "family", "genus", "species"],
+) -> str:
+    return f"""
+create index if not exists "idx_{taxon}_parent"
+    on "{taxon}" (parent);
+"""
+
+
 def create_trigger_update_chinese(
     taxon: Literal["phylum", "class", "order", "family", "genus"],
     child_taxon: Literal["class", "order", "family", "genus", "species"],
 ) -> str:
     return f"""
-create trigger update_{taxon}_chinese
+create trigger if not exists update_{taxon}_chinese
     after update
     on "{taxon}"
 begin
@@ -50,7 +74,7 @@ def create_trigger_delete_taxon(
     child_taxon: Literal["class", "order", "family", "genus", "species"],
 ) -> str:
     return f"""
-create trigger delete_{taxon}
+create trigger if not exists delete_{taxon}
     after delete
     on "{taxon}"
 begin
@@ -61,48 +85,72 @@ end;
 
 def delete_data(
     taxon: Literal["phylum", "class", "order", "family", "genus", "species"],
-    chinese: str,
 ) -> str:
     return f"""
 delete
 from "{taxon}"
-where chinese = '{chinese}';
+where chinese = ?;
 """
 
 
 def retrieve_data_by_child(
     taxon: Literal["phylum", "class", "order", "family", "genus"],
     child_taxon: Literal["class", "order", "family", "genus", "species"],
-    child_chinese: str,
 ) -> str:
     return f"""
-select *
+select "{taxon}".*
 from "{taxon}"
-where chinese = (select parent
-                 from "{child_taxon}"
-                 where chinese = '{child_chinese}');
+         join "{child_taxon}" on "{child_taxon}".parent = "{taxon}".chinese
+where "{child_taxon}".chinese = ?;
 """
 
 
 def retrieve_data_by_chinese(
     taxon: Literal["phylum", "class", "order", "family", "genus", "species"],
-    chinese: str,
 ) -> str:
     return f"""
 select *
 from "{taxon}"
-where chinese = '{chinese}';
+where chinese = ?;
 """
 
 
 def retrieve_data_by_parent(
     taxon: Literal["phylum", "class", "order", "family", "genus", "species"],
-    parent_chinese: str,
 ) -> str:
     return f"""
 select *
 from "{taxon}"
-where parent = '{parent_chinese}';
+where parent = ?;
+"""
+
+
+def retrieve_hierarchical_data_by_child(
+    taxa: tuple[str, ...],
+) -> str:
+    columns = ", ".join(f'"{taxon}".*' for taxon in taxa)
+    return _retrieve_hierarchical_by_child(taxa, columns)
+
+
+def retrieve_hierarchical_names_by_child(
+    taxa: tuple[str, ...],
+) -> str:
+    columns = ", ".join(f'"{taxon}".chinese, "{taxon}".scientific' for taxon in taxa)
+    return _retrieve_hierarchical_by_child(taxa, columns)
+
+
+def _retrieve_hierarchical_by_child(taxa: tuple[str, ...], columns: str) -> str:
+    # taxa从门开始依次排列到子类，逐级用parent连接父类，一次查询返回整条分类链
+    child_taxon = taxa[-1]
+    joins = "".join(
+        f"""
+         join "{taxon}" on "{taxon}".chinese = "{child}".parent"""
+        for taxon, child in zip(taxa[-2::-1], taxa[:0:-1])
+    )
+    return f"""
+select {columns}
+from "{child_taxon}"{joins}
+where "{child_taxon}".chinese = ?;
 """
 
 
@@ -117,30 +165,26 @@ from "{taxon}";
 
 def update_chinese(
     taxon: Literal["phylum", "class", "order", "family", "genus", "species"],
-    chinese: str,
-    new_chinese: str,
 ) -> str:
     return f"""
 update "{taxon}"
-set chinese = '{new_chinese}'
-where chinese = '{chinese}';
+set chinese = ?
+where chinese = ?;
 """
 
 
 def update_scientific(
     taxon: Literal["phylum", "class", "order", "family", "genus", "species"],
-    chinese: str,
-    new_scientific: str,
 ) -> str:
     return f"""
 update "{taxon}"
-set scientific = '{new_scientific}'
-where chinese = '{chinese}';
+set scientific = ?
+where chinese = ?;
 """
 
 
 CREATE_TABLE_PHYLUM = """
-create table phylum
+create table if not exists phylum
 (
     chinese     text NOT NULL,
     scientific  text NOT NULL,
@@ -150,3 +194,50 @@ create table phylum
 """
 
 INITIALIZE = "pragma foreign_keys = 1;"
+
+# 数据库结构的版本号，新建的数据库user_version为0，建好所有表和触发器后记为此值
+SCHEMA_VERSION = 1
+RETRIEVE_USER_VERSION = "pragma user_version;"
+UPDATE_USER_VERSION = f"pragma user_version = {SCHEMA_VERSION};"
+
+# WAL模式下读写互不阻塞；synchronous = NORMAL时提交不再fsync，只在检查点同步WAL，
+# 代价是断电或系统崩溃后最近几次提交可能丢失（不会损坏数据库）。
+# journal_mode = WAL会写入数据库文件，其他打开同一文件的程序也将使用WAL模式。
+# 临时表放在内存中，页缓存约20MB，并以mmap方式读取至多256MB的数据库文件
+PRAGMAS = """
+pragma journal_mode = WAL;
+pragma synchronous = NORMAL;
+pragma temp_store = MEMORY;
+pragma cache_size = -20000;
+pragma mmap_size = 268435456;
+"""
+
+# 类别只有六个，所有增删查改模板在导入时一次性生成，查询时直接以`Taxon`为下标取用
+CREATE_DATA = tuple(create_data(taxon) for taxon in TAXA_NAMES)
+DELETE_DATA = tuple(delete_data(taxon) for taxon in TAXA_NAMES)
+# 以子类为下标，门没有父类
+RETRIEVE_DATA_BY_CHILD = (
+    None,
+    *(
+        retrieve_data_by_child(taxon, child_taxon)
+        for taxon, child_taxon in zip(TAXA_NAMES, TAXA_NAMES[1:])
+    ),
+)
+RETRIEVE_DATA_BY_CHINESE = tuple(
+    retrieve_data_by_chinese(taxon) for taxon in TAXA_NAMES
+)
+# 门没有父类，直接查询整张表
+RETRIEVE_DATA_BY_PARENT = (
+    retrieve_data_by_taxon("phylum"),
+    *(retrieve_data_by_parent(taxon) for taxon in TAXA_NAMES[1:]),
+)
+RETRIEVE_DATA_BY_TAXON = tuple(retrieve_data_by_taxon(taxon) for taxon in TAXA_NAMES)
+# 以子类为下标，门的分类链只有其自身
+RETRIEVE_HIERARCHICAL_DATA_BY_CHILD = tuple(
+    retrieve_hierarchical_data_by_child(TAXA_NAMES[: i + 1]) for i in range(6)
+)
+RETRIEVE_HIERARCHICAL_NAMES_BY_CHILD = tuple(
+    retrieve_hierarchical_names_by_child(TAXA_NAMES[: i + 1]) for i in range(6)
+)
+UPDATE_CHINESE = tuple(update_chinese(taxon) for taxon in TAXA_NAMES)
+UPDATE_SCIENTIFIC = tuple(update_scientific(taxon) for taxon in TAXA_NAMES)
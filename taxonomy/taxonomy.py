@@ -4,9 +4,10 @@
 
 import sqlite3
 from pathlib import Path
-from typing import Literal, Union
+from typing import Iterable, Union
 
 from . import commands
+from .commands import Taxon
 
 
 class Taxonomy:
@@ -32,20 +33,19 @@ class Taxonomy:
     """
 
     def __init__(self, database: Path) -> None:
-        self._requires_init = False if database.exists() else True
-
         # 连接数据库
+        # sqlite3默认按SQL文本缓存128条已编译语句，已能容纳`commands`中的所有模板
         self._connect = sqlite3.connect(database)
+        # 查询结果既可按下标也可按列名访问，如`item["chinese"]`
+        self._connect.row_factory = sqlite3.Row
         self._cursor = self._connect.cursor()
         self._execute(commands.INITIALIZE)
+        self._connect.executescript(commands.PRAGMAS)
 
-        self._taxa = ["phylum", "class", "order", "family", "genus", "species"]
-
-        # 初始化数据库
-        if self._requires_init:
-            self._create_tables()
-            self._create_triggers()
-            self.commit()
+        # 初始化数据库，以user_version判断，不存在的文件会由connect新建
+        self._execute(commands.RETRIEVE_USER_VERSION)
+        if self._fetchone()[0] == 0:
+            self._create_schema()
 
     def close(self) -> None:
         """关闭数据库。
@@ -67,7 +67,7 @@ class Taxonomy:
 
     def create_data(
         self,
-        taxon: Literal["phylum", "class", "order", "family", "genus", "species"],
+        taxon: Taxon,
         chinese: str,
         scientific: str,
         description: str,
@@ -82,18 +82,32 @@ class Taxonomy:
             description: 生物的长文字描述。
             parent: 生物父类的中文名，门没有父类填None。
         """
-        idx = self._taxa.index(taxon)
-        if (idx == 0) and (parent is not None):
-            raise ValueError("当 `taxon` 为 `genus` 时 `parent` 必须为 `None`")
+        if taxon == Taxon.PHYLUM:
+            if parent is not None:
+                raise ValueError("当 `taxon` 为 `Taxon.PHYLUM` 时 `parent` 必须为 `None`")
+            params = (chinese, scientific, description)
+        else:
+            params = (chinese, scientific, description, parent)
+        self._execute(commands.CREATE_DATA[taxon], params)
+
+    def create_data_many(
+        self,
+        taxon: Taxon,
+        rows: Iterable[tuple],
+    ) -> None:
+        """批量插入同一类别的多条生物信息。
 
-        values = [f"'{chinese}', '{scientific}', '{description}'"]
-        if idx != 0:
-            values.append(f"'{parent}'")
-        self._execute(commands.create_data(taxon, values))
+        所有记录共用一条编译好的插入语句，并处于同一个事务中，调用`commit`时一次性提交。
+
+        Args:
+            taxon: 生物的类别。
+            rows: 每条记录依次为中文名、学名、长文字描述和父类的中文名，门没有父类，只需前三项。
+        """
+        self._cursor.executemany(commands.CREATE_DATA[taxon], rows)
 
     def delete_data(
         self,
-        taxon: Literal["phylum", "class", "order", "family", "genus", "species"],
+        taxon: Taxon,
         chinese: str,
     ) -> None:
         """给定生物的类别和中文名删除其数据。
@@ -102,13 +116,13 @@ class Taxonomy:
             taxon: 生物的类别。
             chinese: 生物的中文名。
         """
-        self._execute(commands.delete_data(taxon, chinese))
+        self._execute(commands.DELETE_DATA[taxon], (chinese,))
 
     def retrieve_data_by_child(
         self,
-        child_taxon: Literal["class", "order", "family", "genus", "species"],
+        child_taxon: Taxon,
         child_chinese: str,
-    ) -> tuple:
+    ) -> sqlite3.Row:
         """给定生物的类别和中文名返回其父类的全部信息。
 
         Args:
@@ -118,19 +132,18 @@ class Taxonomy:
         Returns:
             生物父类的全部信息。
         """
-        idx = self._taxa.index(child_taxon)
-        taxon = self._taxa[idx - 1]
-        self._execute(
-            commands.retrieve_data_by_child(taxon, child_taxon, child_chinese)
-        )
+        if child_taxon == Taxon.PHYLUM:
+            raise ValueError("`child_taxon` 不能为 `Taxon.PHYLUM`，门没有父类")
+
+        self._execute(commands.RETRIEVE_DATA_BY_CHILD[child_taxon], (child_chinese,))
 
         return self._fetchone()
 
     def retrieve_data_by_chinese(
         self,
-        taxon: Literal["phylum", "class", "order", "family", "genus", "species"],
+        taxon: Taxon,
         chinese: str,
-    ) -> tuple:
+    ) -> sqlite3.Row:
         """给定生物的类别和中文名返回该生物的全部信息。
 
         Args:
@@ -142,24 +155,24 @@ class Taxonomy:
 
         Examples:
             ```python
-            from taxonomy import Taxonomy
+            from taxonomy import Taxon, Taxonomy
 
             database = Taxonomy("databases/phytoplankton.db")
-            phylum_info = database.get_record_by_chinese("genus", "角甲藻属")
+            phylum_info = database.get_record_by_chinese(Taxon.GENUS, "角甲藻属")
 
-            >>> phylum_info
+            >>> tuple(phylum_info)
             ('角甲藻属', 'Ceratium', '无', 0.0, 0.0, 100.0, 100.0, '角甲藻科')
             ```
         """
-        self._execute(commands.retrieve_data_by_chinese(taxon, chinese))
+        self._execute(commands.RETRIEVE_DATA_BY_CHINESE[taxon], (chinese,))
 
         return self._fetchone()
 
     def retrieve_data_by_parent(
         self,
-        taxon: Literal["phylum", "class", "order", "family", "genus", "species"],
+        taxon: Taxon,
         parent_chinese: Union[str, None],
-    ) -> list[tuple]:
+    ) -> list[sqlite3.Row]:
         """给定生物的类别和父类的中文名返回该类别所有生物的信息。
 
         Args:
@@ -169,19 +182,15 @@ class Taxonomy:
         Returns:
             该生物的全部信息。
         """
-        # 门
-        if taxon == "phylum":
-            return self.retrieve_data_by_taxon("phylum")
-
-        # 纲目科属种
-        self._execute(commands.retrieve_data_by_parent(taxon, parent_chinese))
+        params = () if taxon == Taxon.PHYLUM else (parent_chinese,)
+        self._execute(commands.RETRIEVE_DATA_BY_PARENT[taxon], params)
 
         return self._fetchall()
 
     def retrieve_data_by_taxon(
         self,
-        taxon: Literal["phylum", "class", "order", "family", "genus", "species"],
-    ) -> list[tuple]:
+        taxon: Taxon,
+    ) -> list[sqlite3.Row]:
         """查询门、纲、目、科、属、种六类中某一类别所有生物的信息。
 
         Args:
@@ -190,13 +199,13 @@ class Taxonomy:
         Returns:
             类别中包含的所有生物的信息。
         """
-        self._execute(commands.retrieve_data_by_taxon(taxon))
+        self._execute(commands.RETRIEVE_DATA_BY_TAXON[taxon])
 
         return self._fetchall()
 
     def retrieve_hierarchical_parents_by_child(
         self,
-        child_taxon: Literal["class", "order", "family", "genus", "species"],
+        child_taxon: Taxon,
         child_chinese: str,
         return_child: bool = False,
         names_only: bool = False,
@@ -214,47 +223,47 @@ class Taxonomy:
 
         Examples "示例"
         ```python
-        from taxonomy import Taxonomy
+        from taxonomy import Taxon, Taxonomy
 
         database = Taxonomy("databases/phytoplankton.db")
-        names = database.retrieve_hierarchical_parents_by_child("genus", "角甲藻属", return_child=True, names_only=True)
+        names = database.retrieve_hierarchical_parents_by_child(Taxon.GENUS, "角甲藻属", return_child=True, names_only=True)
 
         >>> names
         [('甲藻门', 'Dinophyta'), ('甲藻纲', 'Dinophyceae'), ('多甲藻目', 'Peridiniales'), ('角甲藻科', 'Ceratiaceae'), ('角甲藻属', 'Ceratium')]
         ```
         """
-        parents = []
-        if return_child:
-            item = self.retrieve_data_by_chinese(child_taxon, child_chinese)
-            parents.append(item)
-
-        idx = self._taxa.index(child_taxon)
-        while idx != 0:
-            parent = self.retrieve_data_by_child(child_taxon, child_chinese)
-
-            parents.insert(0, parent)
-            idx -= 1
-            child_taxon = self._taxa[idx]
-            child_chinese = parent[0]
-
+        # 仅需名称时只查询中文名和学名两列，不读取长文字描述
         if names_only:
-            names = []
-            for item in parents:
-                names.append(item[:2])
-            return names
+            sql = commands.RETRIEVE_HIERARCHICAL_NAMES_BY_CHILD[child_taxon]
         else:
-            return parents
+            sql = commands.RETRIEVE_HIERARCHICAL_DATA_BY_CHILD[child_taxon]
+        self._execute(sql, (child_chinese,))
+        row = self._fetchone()
+        if row is None:
+            return []
+
+        # 查询结果为一整行，需按类别依次切分：
+        # 仅含名称时每类2列，否则门3列、其余类别4列
+        if names_only:
+            parents = [row[start : start + 2] for start in range(0, len(row), 2)]
+        else:
+            parents = [row[:3]]
+            parents += [row[start : start + 4] for start in range(3, len(row), 4)]
+        if not return_child:
+            parents.pop()
+
+        return parents
 
     def rollback(self) -> None:
         """数据库回滚。
 
-        封装了SQL中的`rollback;`语句，用于想撤销改动时调用。
+        撤销上次`commit`之后的所有改动，由sqlite3驱动结束当前事务，用于想撤销改动时调用。
         """
         self._connect.rollback()
 
     def update_chinese(
         self,
-        taxon: Literal["phylum", "class", "order", "family", "genus", "species"],
+        taxon: Taxon,
         chinese: str,
         new_chinese: str,
     ) -> None:
@@ -265,11 +274,11 @@ class Taxonomy:
             chinese: 生物的中文名。
             new_chinese: 生物的新中文名。
         """
-        self._execute(commands.update_chinese(taxon, chinese, new_chinese))
+        self._execute(commands.UPDATE_CHINESE[taxon], (new_chinese, chinese))
 
     def update_scientific(
         self,
-        taxon: Literal["phylum", "class", "order", "family", "genus", "species"],
+        taxon: Taxon,
         chinese: str,
         new_scientific: str,
     ) -> None:
@@ -280,28 +289,36 @@ class Taxonomy:
             chinese: 生物的中文名。
             new_scientific: 生物的新学名。
         """
-        self._execute(commands.update_scientific(taxon, chinese, new_scientific))
+        self._execute(commands.UPDATE_SCIENTIFIC[taxon], (new_scientific, chinese))
 
-    def _create_tables(self) -> None:
-        self._execute(commands.CREATE_TABLE_PHYLUM)
+    def _create_schema(self) -> None:
+        # 所有建表和建触发器语句在同一个事务中执行，只需提交一次
+        ddl = [commands.CREATE_TABLE_PHYLUM]
+        taxa = commands.TAXA_NAMES
         for i in range(1, 6):
-            parent_taxon, taxon = self._taxa[i - 1], self._taxa[i]
-            self._execute(commands.create_table_class_to_species(taxon, parent_taxon))
+            parent_taxon, taxon = taxa[i - 1], taxa[i]
+            ddl.append(commands.create_table_class_to_species(taxon, parent_taxon))
+            # 按父类查询和触发器级联修改、删除时都以parent为条件
+            ddl.append(commands.create_index_parent(taxon))
 
-    def _create_triggers(self) -> None:
         # 门纲目科属：
         # 1. 修改chinese字段后需修改其所有子类的parent字段
         # 2. 门纲目科属：删除某一类时，子类也要被删除
         for i in range(5):
-            taxon, child_taxon = self._taxa[i], self._taxa[i + 1]
-            self._execute(commands.create_trigger_update_chinese(taxon, child_taxon))
-            self._execute(commands.create_trigger_delete_taxon(taxon, child_taxon))
+            taxon, child_taxon = taxa[i], taxa[i + 1]
+            ddl.append(commands.create_trigger_update_chinese(taxon, child_taxon))
+            ddl.append(commands.create_trigger_delete_taxon(taxon, child_taxon))
+
+        # 建表语句均带有if not exists，旧版未记录版本号的数据库也会补齐索引并记录版本号
+        ddl.append(commands.UPDATE_USER_VERSION)
+
+        self._connect.executescript("begin;" + "".join(ddl) + "commit;")
 
-    def _execute(self, sql: str) -> None:
-        self._cursor.execute(sql)
+    def _execute(self, sql: str, params: tuple = ()) -> None:
+        self._cursor.execute(sql, params)
 
-    def _fetchall(self) -> list[tuple]:
+    def _fetchall(self) -> list[sqlite3.Row]:
         return self._cursor.fetchall()
 
-    def _fetchone(self) -> tuple:
+    def _fetchone(self) -> sqlite3.Row:
         return self._cursor.fetchone()
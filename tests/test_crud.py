@@ -1,33 +1,41 @@
+import sqlite3
 from pathlib import Path
 
 import pytest
-from taxonomy import Taxonomy
+from taxonomy import Taxon, Taxonomy, commands
 
 filename = Path("../databases/test.db")
 taxa = ("phylum", "class", "order", "family", "genus", "species")
 test_data = {
-    "phylum": ("phylum", "蓝藻门", "Cyanophyta", "", None),
-    "class": ("class", "蓝藻纲", "Cyanophyceae", "", "蓝藻门"),
-    "order": ("order", "色球藻目", "Chroococcales", "", "蓝藻纲"),
-    "family": ("family", "微囊藻科", "Microcystaceae", "", "色球藻目"),
-    "genus": ("genus", "微囊藻属", "Microcystis", "", "微囊藻科"),
+    "phylum": (Taxon.PHYLUM, "蓝藻门", "Cyanophyta", "", None),
+    "class": (Taxon.CLASS, "蓝藻纲", "Cyanophyceae", "", "蓝藻门"),
+    "order": (Taxon.ORDER, "色球藻目", "Chroococcales", "", "蓝藻纲"),
+    "family": (Taxon.FAMILY, "微囊藻科", "Microcystaceae", "", "色球藻目"),
+    "genus": (Taxon.GENUS, "微囊藻属", "Microcystis", "", "微囊藻科"),
     "species": (
-        ("species", "铜绿微囊藻", "Microcystis aeruginosa", "", "微囊藻属"),
-        ("species", "水华微囊藻", "Microcystis flosaquae", "", "微囊藻属"),
+        (Taxon.SPECIES, "铜绿微囊藻", "Microcystis aeruginosa", "", "微囊藻属"),
+        (Taxon.SPECIES, "水华微囊藻", "Microcystis flosaquae", "", "微囊藻属"),
     ),
 }
 
 
+@pytest.fixture(scope="module")
+def database():
+    """所有测试共用同一个连接，首次使用时删除旧文件以测试初始化。"""
+    # WAL模式下还会有-wal和-shm两个附属文件
+    for suffix in ("", "-wal", "-shm"):
+        Path(f"{filename}{suffix}").unlink(missing_ok=True)
+    database = Taxonomy(filename)
+    yield database
+    database.close()
+
+
 @pytest.mark.dependency(name="init")
 class TestInit:
     """测试无数据库文件时初始化是否成功。"""
 
     @pytest.mark.dependency(name="create_tables")
-    def test_create_tables(self):
-        if filename.exists():
-            filename.unlink(missing_ok=True)
-        database = Taxonomy(filename)
-
+    def test_create_tables(self, database):
         database._execute(
             """
 select name
@@ -42,6 +50,7 @@ where type = 'table';
 
     @pytest.mark.dependency(depends=["create_tables"])
     def test_create_triggers(self):
+        # 另开一个连接打开已存在的数据库文件，表和触发器应保持不变
         database = Taxonomy(filename)
         database._execute(
             """
@@ -58,39 +67,108 @@ where type = 'trigger';
                 and items[2 * i + 1][0] == f"delete_{taxa[i]}"
             )
 
+        database._execute("select name from sqlite_master where type = 'table';")
+        assert [item[0] for item in database._fetchall()] == list(taxa)
+
+        database.close()
+
+    @pytest.mark.dependency(depends=["create_tables"])
+    def test_create_indexes(self, database):
+        database._execute(
+            """
+select name
+from sqlite_master
+where type = 'index'
+  and name like 'idx_%';
+"""
+        )
+        items = database._fetchall()
+        assert [item[0] for item in items] == [
+            f"idx_{taxon}_parent" for taxon in taxa[1:]
+        ]
+
+    @pytest.mark.dependency(depends=["create_tables"])
+    def test_reopen_stamped(self, database, monkeypatch):
+        # 已记录版本号的数据库再次打开时不应重新执行建表语句
+        def fail(self):
+            raise AssertionError("`_create_schema` should not run")
+
+        monkeypatch.setattr(Taxonomy, "_create_schema", fail)
+        first, second = Taxonomy(filename), Taxonomy(filename)
+        for other in (first, second):
+            other._execute(commands.RETRIEVE_USER_VERSION)
+            assert other._fetchone()[0] == commands.SCHEMA_VERSION
+            other.close()
+
+    @pytest.mark.dependency()
+    def test_stamp_unversioned(self, tmp_path):
+        # 未记录版本号的旧数据库：已有表但没有索引，打开后应补齐索引并记录版本号
+        path = tmp_path / "unversioned.db"
+        connect = sqlite3.connect(path)
+        ddl = [commands.CREATE_TABLE_PHYLUM]
+        for parent_taxon, taxon in zip(taxa, taxa[1:]):
+            ddl.append(commands.create_table_class_to_species(taxon, parent_taxon))
+        connect.executescript("".join(ddl))
+        connect.close()
+
+        database = Taxonomy(path)
+        database._execute(commands.RETRIEVE_USER_VERSION)
+        assert database._fetchone()[0] == commands.SCHEMA_VERSION
+        database._execute(
+            "select name from sqlite_master where type = 'index' and name like 'idx_%';"
+        )
+        assert [item[0] for item in database._fetchall()] == [
+            f"idx_{taxon}_parent" for taxon in taxa[1:]
+        ]
         database.close()
 
 
 @pytest.mark.dependency(name="create", depends=["init"])
 class TestCreate:
     @pytest.mark.dependency(name="create_phylum")
-    def test_create_phylum(self):
-        self._test_template(test_data["phylum"], 3)
+    def test_create_phylum(self, database):
+        self._test_template(database, test_data["phylum"], 3)
 
     @pytest.mark.dependency(name="create_class", depends=["create_phylum"])
-    def test_create_class(self):
-        self._test_template(test_data["class"], 4)
+    def test_create_class(self, database):
+        self._test_template(database, test_data["class"], 4)
 
     @pytest.mark.dependency(name="create_order", depends=["create_class"])
-    def test_create_order(self):
-        self._test_template(test_data["order"], 4)
+    def test_create_order(self, database):
+        self._test_template(database, test_data["order"], 4)
 
     @pytest.mark.dependency(name="create_family", depends=["create_order"])
-    def test_create_family(self):
-        self._test_template(test_data["family"], 4)
+    def test_create_family(self, database):
+        self._test_template(database, test_data["family"], 4)
 
     @pytest.mark.dependency(name="create_genus", depends=["create_family"])
-    def test_create_genus(self):
-        self._test_template(test_data["genus"], 4)
+    def test_create_genus(self, database):
+        self._test_template(database, test_data["genus"], 4)
 
     @pytest.mark.dependency(name="create_species", depends=["create_genus"])
-    def test_create_species(self):
-        self._test_template(test_data["species"][0], 4)
-        self._test_template(test_data["species"][1], 4)
+    def test_create_species(self, database):
+        self._test_template(database, test_data["species"][0], 4)
+        self._test_template(database, test_data["species"][1], 4)
+
+    @pytest.mark.dependency(depends=["create_genus"])
+    def test_create_data_many(self, database):
+        rows = [
+            ("惠氏微囊藻", "Microcystis wesenbergii", "", "微囊藻属"),
+            ("绿色微囊藻", "Microcystis viridis", "", "微囊藻属"),
+        ]
+        database.create_data_many(Taxon.SPECIES, rows)
+        database.commit()
+
+        for row in rows:
+            item = database.retrieve_data_by_chinese(Taxon.SPECIES, row[0])
+            assert tuple(item) == row
+
+        for row in rows:
+            database.delete_data(Taxon.SPECIES, row[0])
+        database.commit()
 
     @staticmethod
-    def _test_template(data: tuple, length: int):
-        database = Taxonomy(filename)
+    def _test_template(database: Taxonomy, data: tuple, length: int):
         database.create_data(*data)
         database.commit()
 
@@ -103,44 +181,45 @@ class TestCreate:
 @pytest.mark.dependency(name="retrieve", depends=["create"])
 class TestRetrieve:
     @pytest.mark.dependency()
-    def test_retrieve_date_by_child(self):
-        database = Taxonomy(filename)
-        item = database.retrieve_data_by_child("class", "蓝藻纲")
+    def test_retrieve_date_by_child(self, database):
+        item = database.retrieve_data_by_child(Taxon.CLASS, "蓝藻纲")
         self._valid(test_data["phylum"], item, 3)
 
     @pytest.mark.dependency()
-    def test_retrieve_data_by_chinese(self):
-        database = Taxonomy(filename)
-        item = database.retrieve_data_by_chinese("class", "蓝藻纲")
+    def test_retrieve_data_by_child_phylum(self, database):
+        with pytest.raises(ValueError):
+            database.retrieve_data_by_child(Taxon.PHYLUM, "蓝藻门")
+
+    @pytest.mark.dependency()
+    def test_retrieve_data_by_chinese(self, database):
+        item = database.retrieve_data_by_chinese(Taxon.CLASS, "蓝藻纲")
         self._valid(test_data["class"], item, 4)
+        assert item["chinese"] == "蓝藻纲" and item["parent"] == "蓝藻门"
 
     @pytest.mark.dependency()
-    def test_retrieve_data_by_parent(self):
-        database = Taxonomy(filename)
-        items = database.retrieve_data_by_parent("phylum", None)
+    def test_retrieve_data_by_parent(self, database):
+        items = database.retrieve_data_by_parent(Taxon.PHYLUM, None)
         assert len(items) == 1
         self._valid(test_data["phylum"][:-1], items[0], 3)
-        items = database.retrieve_data_by_parent("species", "微囊藻属")
+        items = database.retrieve_data_by_parent(Taxon.SPECIES, "微囊藻属")
         assert len(items) == 2
         self._valid(test_data["species"][0], items[0], 4)
         self._valid(test_data["species"][1], items[1], 4)
 
     @pytest.mark.dependency()
-    def test_retrieve_data_by_taxon(self):
-        database = Taxonomy(filename)
-        items = database.retrieve_data_by_taxon("species")
+    def test_retrieve_data_by_taxon(self, database):
+        items = database.retrieve_data_by_taxon(Taxon.SPECIES)
         assert len(items) == 2
         self._valid(test_data["species"][0], items[0], 4)
         self._valid(test_data["species"][1], items[1], 4)
 
     @pytest.mark.dependency()
-    def test_retrieve_hierarchical_parents_by_child(self):
-        database = Taxonomy(filename)
-        items = database.retrieve_hierarchical_parents_by_child("class", "蓝藻纲")
+    def test_retrieve_hierarchical_parents_by_child(self, database):
+        items = database.retrieve_hierarchical_parents_by_child(Taxon.CLASS, "蓝藻纲")
         assert len(items) == 1 and items[0] == test_data["phylum"][1:-1]
 
         items = database.retrieve_hierarchical_parents_by_child(
-            "genus", "微囊藻属", True, True
+            Taxon.GENUS, "微囊藻属", True, True
         )
         assert (
             len(items) == 5
@@ -151,6 +230,21 @@ class TestRetrieve:
             and items[4] == test_data["genus"][1:3]
         )
 
+    @pytest.mark.dependency()
+    def test_retrieve_hierarchical_parents_by_phylum(self, database):
+        items = database.retrieve_hierarchical_parents_by_child(
+            Taxon.PHYLUM, "蓝藻门", True
+        )
+        assert items == [test_data["phylum"][1:-1]]
+
+        items = database.retrieve_hierarchical_parents_by_child(
+            Taxon.PHYLUM, "蓝藻门", True, True
+        )
+        assert items == [test_data["phylum"][1:3]]
+
+        items = database.retrieve_hierarchical_parents_by_child(Taxon.PHYLUM, "蓝藻门")
+        assert items == []
+
     @staticmethod
     def _valid(data: tuple, item, length: int):
         assert len(item) == length
@@ -161,26 +255,23 @@ class TestRetrieve:
 @pytest.mark.dependency(name="update", depends=["create"])
 class TestUpdate:
     @pytest.mark.dependency()
-    def test_update_chinese(self):
-        database = Taxonomy(filename)
-        database.update_chinese("species", "铜绿微囊藻", "微囊藻")
-        item = database.retrieve_data_by_chinese("species", "微囊藻")
+    def test_update_chinese(self, database):
+        database.update_chinese(Taxon.SPECIES, "铜绿微囊藻", "微囊藻")
+        item = database.retrieve_data_by_chinese(Taxon.SPECIES, "微囊藻")
         assert item is not None
 
     @pytest.mark.dependency()
-    def test_update_scientific(self):
-        database = Taxonomy(filename)
-        database.update_scientific("species", "水华微囊藻", "LOL")
-        item = database.retrieve_data_by_chinese("species", "水华微囊藻")
+    def test_update_scientific(self, database):
+        database.update_scientific(Taxon.SPECIES, "水华微囊藻", "LOL")
+        item = database.retrieve_data_by_chinese(Taxon.SPECIES, "水华微囊藻")
         assert item[1] == "LOL"
 
 
 @pytest.mark.dependency(name="delete", depends=["create"])
 class TestDelete:
     @pytest.mark.dependency()
-    def test_delete_date(self):
-        database = Taxonomy(filename)
-        database.delete_data("phylum", "蓝藻门")
-        for taxon in taxa:
+    def test_delete_date(self, database):
+        database.delete_data(Taxon.PHYLUM, "蓝藻门")
+        for taxon in Taxon:
             items = database.retrieve_data_by_taxon(taxon)
             assert items == []